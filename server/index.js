@@ -535,7 +535,7 @@ app.post('/api/save-metadata', (req, res) => {
 // Generate PDF report
 app.post('/api/generate-report', async (req, res) => {
   try {
-    const { fileId, originalFilename } = req.body;
+    const { fileId, originalFilename, legacy3D = false } = req.body;
     
     if (!fileId) {
       return res.status(400).json({ error: 'File ID is required' });
@@ -563,10 +563,11 @@ app.post('/api/generate-report', async (req, res) => {
     console.log(`Input file: ${fileId}`);
     console.log(`Original filename: ${originalFilename}`);
     console.log(`Output file: ${outputFilename}`);
+    console.log(`Legacy 3D view: ${legacy3D === true}`);
     console.log('='.repeat(60));
     
     // Call JavaScript report generator
-    const result = await generateReport(inputFile, outputFile, originalFilename);
+    const result = await generateReport(inputFile, outputFile, originalFilename, { legacy3D: legacy3D === true });
     
     if (!result.success) {
       console.error('Report generation failed:', result.error);
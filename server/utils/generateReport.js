@@ -5,7 +5,7 @@
  * one-page PDF report in English with:
  * - Statistical analysis (count, extent, mean, std dev)
  * - Z-value histogram
- * - 3D visualization with Z-based coloring
+ * - Top-down view with Z-based coloring
  * - Average nearest neighbor distance
  * 
  * The PDF is optimized to stay under 2 MB through image compression.
@@ -13,56 +13,365 @@
 
 const fs = require('fs');
 const path = require('path');
-const PDFDocument = require('pdfkit');
-const { ChartJSNodeCanvas } = require('chartjs-node-canvas');
+const Module = require('module');
+
+// When run as a standalone script, cache the compiled code of this module's
+// dependencies on disk (Node.js >= 22.1) so later invocations skip recompiling
+// them. Inside the server, modules and optimized code stay loaded between reports.
+if (require.main === module && typeof Module.enableCompileCache === 'function') {
+  Module.enableCompileCache();
+}
+
+const { buildKdTree, nearestNeighborSquaredDistance } = require('./kdTree');
+const { buildUniformGrid, gridNearestNeighborSquaredDistance } = require('./spatialGrid');
+const { createSeededRandom, randomSampleIndices } = require('./sampling');
+
+// Optional seed for point sampling (set REPORT_RANDOM_SEED for reproducible reports)
+const REPORT_RANDOM_SEED = process.env.REPORT_RANDOM_SEED;
+
+// Reports larger than this are rebuilt once with more strongly compressed images
+const MAX_REPORT_SIZE_BYTES = 2 * 1024 * 1024;
+
+// Bytes read from the input file at a time
+const READ_CHUNK_SIZE = 4 * 1024 * 1024;
+
+// Character codes used by the XYZ scanner
+const CHAR_LF = 10;
+const CHAR_CR = 13;
+const CHAR_TAB = 9;
+const CHAR_SPACE = 32;
+const CHAR_COMMA = 44;
+const CHAR_HASH = 35;
+const CHAR_PLUS = 43;
+const CHAR_MINUS = 45;
+const CHAR_DOT = 46;
+const CHAR_0 = 48;
+const CHAR_9 = 57;
+
+// Exact powers of ten (10^0 .. 10^22 are representable without rounding)
+const POW10 = [];
+for (let i = 0; i <= 22; i++) POW10.push(Math.pow(10, i));
+
+// Nearest neighbor search uses a uniform grid for clouds of at least this many points
+const GRID_NN_MIN_POINTS = 1000;
+// Grids with more points than this in a single cell (strong clustering) use the KD-tree instead
+const GRID_NN_MAX_CELL_POINTS = 64;
+
+// Number of entries in the precomputed depth colormap
+const DEPTH_COLORMAP_SIZE = 256;
+
+/**
+ * Map a normalized depth to a viridis-like color (simplified)
+ * @param {number} normalized - Depth normalized to the 0-1 range
+ * @returns {Array<number>} [r, g, b] components in the 0-255 range
+ */
+function depthColorComponents(normalized) {
+  const r = Math.floor(255 * Math.max(0, Math.min(1, 1.5 - Math.abs(normalized - 0.5) * 2)));
+  const g = Math.floor(255 * normalized);
+  const b = Math.floor(255 * (1 - normalized));
+  return [r, g, b];
+}
+
+// Point colors computed once and shared by all points of the same quantized depth
+const DEPTH_POINT_COLORS = [];
+for (let i = 0; i < DEPTH_COLORMAP_SIZE; i++) {
+  const [r, g, b] = depthColorComponents(i / (DEPTH_COLORMAP_SIZE - 1));
+  DEPTH_POINT_COLORS.push(`rgba(${r}, ${g}, ${b}, 0.6)`);
+}
+
+// Opaque RGB components per quantized depth, used to fill raster pixels
+const DEPTH_RASTER_RGB = new Uint8Array(DEPTH_COLORMAP_SIZE * 3);
+for (let i = 0; i < DEPTH_COLORMAP_SIZE; i++) {
+  DEPTH_RASTER_RGB.set(depthColorComponents(i / (DEPTH_COLORMAP_SIZE - 1)), i * 3);
+}
+
+// Number of square bins along the longer side of the top-down view
+const TOP_DOWN_BINS = 120;
+
+/**
+ * Point cloud stored as structure-of-arrays: one contiguous typed array per
+ * coordinate. Float64 is kept (rather than Float32) because georeferenced
+ * coordinates such as UTM northings need more than 7 significant digits.
+ * @typedef {Object} PointCloud
+ * @property {Float64Array} x - X coordinates
+ * @property {Float64Array} y - Y coordinates
+ * @property {Float64Array} z - Z coordinates
+ * @property {number} count - Number of points
+ */
+
+/**
+ * Check if a character code separates fields in an XYZ line
+ * @param {number} c - Character code
+ * @returns {boolean} True for space, tab, comma and carriage return
+ */
+function isSeparator(c) {
+  return c === CHAR_SPACE || c === CHAR_TAB || c === CHAR_COMMA || c === CHAR_CR;
+}
+
+/**
+ * Parse a numeric token of the form [+-]digits[.digits] without allocating
+ * a substring. Mantissas up to 15 digits are divided by an exact power of
+ * ten, which gives the same correctly rounded result as parseFloat.
+ * Anything else (exponents, long mantissas, garbage) falls back to parseFloat
+ * so behaviour matches the previous parser.
+ * @param {Buffer} bytes - Raw file bytes
+ * @param {number} start - Index of the first byte of the token
+ * @param {number} end - Index one past the last byte of the token
+ * @returns {number} Parsed value (NaN if the token is not numeric)
+ */
+function parseNumberToken(bytes, start, end) {
+  let i = start;
+  let negative = false;
+  let c = bytes[i];
+  if (c === CHAR_MINUS || c === CHAR_PLUS) {
+    negative = c === CHAR_MINUS;
+    i++;
+  }
+  
+  let mantissa = 0;
+  let digits = 0;
+  let fractionDigits = 0;
+  let seenDot = false;
+  
+  for (; i < end; i++) {
+    c = bytes[i];
+    if (c >= CHAR_0 && c <= CHAR_9) {
+      mantissa = mantissa * 10 + (c - CHAR_0);
+      digits++;
+      if (seenDot) fractionDigits++;
+    } else if (c === CHAR_DOT && !seenDot) {
+      seenDot = true;
+    } else {
+      break;
+    }
+  }
+  
+  if (i === end && digits > 0 && digits <= 15) {
+    const value = fractionDigits === 0 ? mantissa : mantissa / POW10[fractionDigits];
+    return negative ? -value : value;
+  }
+  
+  return parseFloat(bytes.toString('utf-8', start, end));
+}
+
+// Chart.js and node-canvas, loaded on first use (see getChartModules)
+let chartModules = null;
+
+/**
+ * Load Chart.js and node-canvas
+ * 
+ * The charting modules are only required when the first chart is rendered,
+ * so loading this module (and runs that fail while parsing the input) do not
+ * pay for them. Chart.js is loaded and its components are registered once
+ * per process and shared by every chart.
+ * 
+ * @returns {{Chart: Function, createCanvas: Function}} Chart.js constructor and canvas factory
+ */
+function getChartModules() {
+  if (!chartModules) {
+    const { Chart, registerables } = require('chart.js');
+    const { createCanvas } = require('canvas');
+    Chart.register(...registerables);
+    chartModules = { Chart, createCanvas };
+  }
+  return chartModules;
+}
+
+/**
+ * Render a Chart.js configuration to an image buffer
+ * 
+ * Charts are drawn with Chart.js directly on a fresh canvas, without an
+ * animation or responsive resize pass. The image is encoded asynchronously
+ * (off the main thread) and the chart is destroyed once encoding is done.
+ * PNG output uses a low compression level without row filters, which is much
+ * faster to encode for the flat-colored chart images at a small size cost.
+ * Compact output trades encoding time (PNG) or quality (JPEG) for size.
+ * 
+ * @param {Object} configuration - Chart.js configuration
+ * @param {number} width - Canvas width in pixels
+ * @param {number} height - Canvas height in pixels
+ * @param {string} [mimeType='image/png'] - Output format ('image/png' or 'image/jpeg')
+ * @param {boolean} [compact=false] - Encode for the smallest size
+ * @returns {Promise<Buffer>} Encoded image buffer
+ */
+async function renderChart(configuration, width, height, mimeType = 'image/png', compact = false) {
+  const { Chart, createCanvas } = getChartModules();
+  const canvas = createCanvas(width, height);
+  const chart = new Chart(canvas.getContext('2d'), {
+    ...configuration,
+    options: { ...configuration.options, responsive: false, animation: false }
+  });
+  
+  let encodeOptions;
+  if (mimeType === 'image/jpeg') {
+    encodeOptions = { quality: compact ? 0.5 : 0.75 };
+  } else if (compact) {
+    encodeOptions = { compressionLevel: 9, filters: canvas.PNG_ALL_FILTERS };
+  } else {
+    encodeOptions = { compressionLevel: 3, filters: canvas.PNG_FILTER_NONE };
+  }
+  
+  try {
+    return await new Promise((resolve, reject) => {
+      canvas.toBuffer((err, buffer) => (err ? reject(err) : resolve(buffer)), mimeType, encodeOptions);
+    });
+  } finally {
+    chart.destroy();
+  }
+}
+
+/**
+ * Get the random number generator used to sample points for a report
+ * @returns {function(): number} Seeded generator if REPORT_RANDOM_SEED is set, Math.random otherwise
+ */
+function getSamplingRandom() {
+  if (REPORT_RANDOM_SEED !== undefined && REPORT_RANDOM_SEED !== '') {
+    return createSeededRandom(parseInt(REPORT_RANDOM_SEED, 10) || 0);
+  }
+  return Math.random;
+}
+
+/**
+ * Copy a typed array into a new, larger one
+ * @param {Float64Array} array - Source array
+ * @param {number} capacity - New length
+ * @returns {Float64Array} Grown array containing the source values
+ */
+function growFloat64Array(array, capacity) {
+  const grown = new Float64Array(capacity);
+  grown.set(array);
+  return grown;
+}
 
 /**
  * Parse XYZ point cloud file
+ * 
+ * The file is read in fixed-size chunks and scanned byte by byte, without
+ * decoding it to a string: no per-line trim/split, no regular expressions and
+ * no intermediate string arrays. A line cut off at the end of a chunk is
+ * moved to the front of the buffer and completed by the next read, so memory
+ * use does not grow with the file size beyond the coordinate arrays. Only the
+ * first three fields of each line are read; rows with non-finite values are
+ * dropped. Coordinates are written straight into growable typed arrays.
+ * 
  * @param {string} filepath - Path to the XYZ/TXT/CSV file
- * @returns {Array<{x: number, y: number, z: number}>} Array of point objects
+ * @returns {PointCloud} Parsed point cloud
  */
 function parseXYZFile(filepath) {
   console.log(`[Parser] Reading file: ${path.basename(filepath)}`);
   
-  const fileContent = fs.readFileSync(filepath, 'utf-8');
-  const lines = fileContent.split('\n');
-  const points = [];
+  const values = [0, 0, 0];
+  let xs;
+  let ys;
+  let zs;
+  let capacity;
+  let count = 0;
   
-  for (const line of lines) {
-    const trimmed = line.trim();
-    // Skip empty lines and comments
-    if (!trimmed || trimmed.startsWith('#')) continue;
+  const fd = fs.openSync(filepath, 'r');
+  try {
+    const fileSize = fs.fstatSync(fd).size;
+    
+    // Initial capacity assumes roughly 24 bytes per line
+    capacity = Math.max(1024, Math.ceil(fileSize / 24));
+    xs = new Float64Array(capacity);
+    ys = new Float64Array(capacity);
+    zs = new Float64Array(capacity);
     
-    // Split by whitespace or comma
-    const parts = trimmed.replace(/,/g, ' ').split(/\s+/);
-    if (parts.length >= 3) {
-      const x = parseFloat(parts[0]);
-      const y = parseFloat(parts[1]);
-      const z = parseFloat(parts[2]);
-      
-      if (!isNaN(x) && !isNaN(y) && !isNaN(z)) {
-        points.push({ x, y, z });
+    let buffer = Buffer.allocUnsafe(Math.max(1024, Math.min(READ_CHUNK_SIZE, fileSize)));
+    // Bytes of an incomplete line kept at the start of the buffer
+    let carry = 0;
+    let firstChunk = true;
+    
+    for (;;) {
+      // A single line longer than the buffer: make room for the rest of it
+      if (carry === buffer.length) {
+        const grown = Buffer.allocUnsafe(buffer.length * 2);
+        buffer.copy(grown, 0, 0, carry);
+        buffer = grown;
+      }
+      
+      const bytesRead = fs.readSync(fd, buffer, carry, buffer.length - carry, null);
+      const atEnd = bytesRead === 0;
+      const bytes = buffer.subarray(0, carry + bytesRead);
+      const length = bytes.length;
+      
+      let pos = 0;
+      if (firstChunk) {
+        // Skip a UTF-8 byte order mark
+        if (length >= 3 && bytes[0] === 0xef && bytes[1] === 0xbb && bytes[2] === 0xbf) pos = 3;
+        firstChunk = false;
+      }
+      
+      while (pos < length) {
+        let lineEnd = bytes.indexOf(CHAR_LF, pos);
+        if (lineEnd === -1) {
+          // Keep the partial line for the next chunk (the last line may lack a newline)
+          if (!atEnd) break;
+          lineEnd = length;
+        }
+        
+        // Skip leading separators
+        let i = pos;
+        while (i < lineEnd && isSeparator(bytes[i])) i++;
+        
+        // Skip empty lines and comments
+        if (i < lineEnd && bytes[i] !== CHAR_HASH) {
+          let fields = 0;
+          while (fields < 3 && i < lineEnd) {
+            const tokenStart = i;
+            while (i < lineEnd && !isSeparator(bytes[i])) i++;
+            values[fields++] = parseNumberToken(bytes, tokenStart, i);
+            while (i < lineEnd && isSeparator(bytes[i])) i++;
+          }
+          
+          if (fields === 3 && isFinite(values[0]) && isFinite(values[1]) && isFinite(values[2])) {
+            if (count === capacity) {
+              capacity *= 2;
+              xs = growFloat64Array(xs, capacity);
+              ys = growFloat64Array(ys, capacity);
+              zs = growFloat64Array(zs, capacity);
+            }
+            xs[count] = values[0];
+            ys[count] = values[1];
+            zs[count] = values[2];
+            count++;
+          }
+        }
+        
+        pos = lineEnd + 1;
       }
+      
+      if (atEnd) break;
+      
+      carry = Math.max(0, length - pos);
+      if (carry > 0) bytes.copy(buffer, 0, pos, length);
     }
+  } finally {
+    fs.closeSync(fd);
   }
   
-  if (points.length === 0) {
+  if (count === 0) {
     throw new Error('No valid points found in file');
   }
   
-  console.log(`[Parser] Loaded ${points.length} points`);
-  return points;
+  console.log(`[Parser] Loaded ${count} points`);
+  return {
+    x: xs.slice(0, count),
+    y: ys.slice(0, count),
+    z: zs.slice(0, count),
+    count
+  };
 }
 
 /**
  * Calculate comprehensive statistics for the point cloud
- * @param {Array<{x: number, y: number, z: number}>} points - Array of points
+ * @param {PointCloud} points - Point cloud
  * @returns {Object} Statistics object
  */
 function calculateStatistics(points) {
   console.log('[Analysis] Calculating statistics...');
   
-  if (points.length === 0) {
+  if (points.count === 0) {
     return {
       count: 0,
       xMin: 0, xMax: 0, yMin: 0, yMax: 0, zMin: 0, zMax: 0,
@@ -72,37 +381,59 @@ function calculateStatistics(points) {
     };
   }
   
-  // Calculate min, max, and extract values in a single pass to avoid stack overflow
+  const n = points.count;
+  const xs = points.x;
+  const ys = points.y;
+  const zs = points.z;
+  
+  // Values are shifted by the first point before summing so that sum of
+  // squares does not lose precision on georeferenced (e.g. UTM) coordinates
+  const x0 = xs[0];
+  const y0 = ys[0];
+  const z0 = zs[0];
+  
   let xMin = Infinity, xMax = -Infinity;
   let yMin = Infinity, yMax = -Infinity;
   let zMin = Infinity, zMax = -Infinity;
+  let xSum = 0, ySum = 0, zSum = 0;
+  let xSumSq = 0, ySumSq = 0, zSumSq = 0;
   
-  for (const point of points) {
-    if (point.x < xMin) xMin = point.x;
-    if (point.x > xMax) xMax = point.x;
-    if (point.y < yMin) yMin = point.y;
-    if (point.y > yMax) yMax = point.y;
-    if (point.z < zMin) zMin = point.z;
-    if (point.z > zMax) zMax = point.z;
+  // Min, max, sum and sum of squares in a single pass over the points
+  for (let i = 0; i < n; i++) {
+    const x = xs[i];
+    const y = ys[i];
+    const z = zs[i];
+    
+    if (x < xMin) xMin = x;
+    if (x > xMax) xMax = x;
+    if (y < yMin) yMin = y;
+    if (y > yMax) yMax = y;
+    if (z < zMin) zMin = z;
+    if (z > zMax) zMax = z;
+    
+    const dx = x - x0;
+    const dy = y - y0;
+    const dz = z - z0;
+    xSum += dx; xSumSq += dx * dx;
+    ySum += dy; ySumSq += dy * dy;
+    zSum += dz; zSumSq += dz * dz;
   }
   
-  // Extract coordinates for mean/std calculations
-  const xValues = points.map(p => p.x);
-  const yValues = points.map(p => p.y);
-  const zValues = points.map(p => p.z);
+  // Derive means and (population) standard deviations from the sums
+  const xShiftMean = xSum / n;
+  const yShiftMean = ySum / n;
+  const zShiftMean = zSum / n;
   
-  // Calculate means
-  const xMean = xValues.reduce((a, b) => a + b, 0) / points.length;
-  const yMean = yValues.reduce((a, b) => a + b, 0) / points.length;
-  const zMean = zValues.reduce((a, b) => a + b, 0) / points.length;
+  const xMean = x0 + xShiftMean;
+  const yMean = y0 + yShiftMean;
+  const zMean = z0 + zShiftMean;
   
-  // Calculate standard deviations
-  const xStd = Math.sqrt(xValues.reduce((sum, val) => sum + Math.pow(val - xMean, 2), 0) / points.length);
-  const yStd = Math.sqrt(yValues.reduce((sum, val) => sum + Math.pow(val - yMean, 2), 0) / points.length);
-  const zStd = Math.sqrt(zValues.reduce((sum, val) => sum + Math.pow(val - zMean, 2), 0) / points.length);
+  const xStd = Math.sqrt(Math.max(0, xSumSq / n - xShiftMean * xShiftMean));
+  const yStd = Math.sqrt(Math.max(0, ySumSq / n - yShiftMean * yShiftMean));
+  const zStd = Math.sqrt(Math.max(0, zSumSq / n - zShiftMean * zShiftMean));
   
   const stats = {
-    count: points.length,
+    count: n,
     xMin, xMax, yMin, yMax, zMin, zMax,
     xExtent: xMax - xMin,
     yExtent: yMax - yMin,
@@ -116,77 +447,94 @@ function calculateStatistics(points) {
 }
 
 /**
- * Calculate average nearest neighbor distance using simplified approach
- * @param {Array<{x: number, y: number, z: number}>} points - Array of points
- * @param {number} sampleSize - Maximum number of points to sample
+ * Calculate average nearest neighbor distance
+ * 
+ * The spatial index is built over the full cloud and only the sampled points
+ * are queried, so each sample's true nearest neighbor is found (indexing the
+ * sample alone would overestimate the spacing). Uses a uniform grid (spatial
+ * hash) for reasonably uniform clouds and falls back to a KD-tree for small
+ * or strongly clustered ones.
+ * 
+ * @param {PointCloud} points - Point cloud
+ * @param {number} sampleSize - Maximum number of points to query
  * @returns {number} Average nearest neighbor distance
  */
-function calculateNearestNeighborDistance(points, sampleSize = 1000) {
+function calculateNearestNeighborDistance(points, sampleSize = 5000) {
   console.log('[Analysis] Calculating nearest neighbor distance...');
   
-  // Sample points if dataset is large
-  let samplePoints = points;
-  if (points.length > sampleSize) {
-    samplePoints = [];
-    const step = Math.floor(points.length / sampleSize);
-    for (let i = 0; i < points.length; i += step) {
-      samplePoints.push(points[i]);
-    }
-    console.log(`[Analysis] Using ${samplePoints.length} sampled points for NN calculation`);
+  const { x, y, z, count } = points;
+  
+  // Sample point indices randomly if dataset is large
+  const sampleIndices = randomSampleIndices(count, sampleSize, getSamplingRandom());
+  if (count > sampleSize) {
+    console.log(`[Analysis] Using ${sampleIndices.length} sampled points for NN calculation`);
+  }
+  
+  // Index all points
+  const allIndices = new Int32Array(count);
+  for (let i = 0; i < count; i++) allIndices[i] = i;
+  
+  let nearestSquaredDistance;
+  // buildUniformGrid returns null if the cloud's extent is not finite
+  const grid = count >= GRID_NN_MIN_POINTS
+    ? buildUniformGrid(x, y, z, allIndices)
+    : null;
+  if (grid && grid.maxCellCount <= GRID_NN_MAX_CELL_POINTS) {
+    nearestSquaredDistance = a => gridNearestNeighborSquaredDistance(grid, x[a], y[a], z[a], a);
+  } else {
+    const tree = buildKdTree(x, y, z, allIndices, { leafSize: 32 });
+    nearestSquaredDistance = a => nearestNeighborSquaredDistance(tree, x[a], y[a], z[a], a);
   }
   
   let totalDistance = 0;
   
-  // For each point, find its nearest neighbor
-  for (let i = 0; i < samplePoints.length; i++) {
-    let minDist = Infinity;
-    const p1 = samplePoints[i];
-    
-    for (let j = 0; j < samplePoints.length; j++) {
-      if (i === j) continue;
-      const p2 = samplePoints[j];
-      
-      const dist = Math.sqrt(
-        Math.pow(p1.x - p2.x, 2) +
-        Math.pow(p1.y - p2.y, 2) +
-        Math.pow(p1.z - p2.z, 2)
-      );
-      
-      if (dist < minDist) {
-        minDist = dist;
-      }
-    }
-    
-    totalDistance += minDist;
+  // For each sampled point, find its nearest neighbor in the full cloud
+  // (excluding the point itself, but not exact duplicates of it)
+  for (let i = 0; i < sampleIndices.length; i++) {
+    totalDistance += Math.sqrt(nearestSquaredDistance(sampleIndices[i]));
   }
   
-  const avgDistance = totalDistance / samplePoints.length;
+  const avgDistance = totalDistance / sampleIndices.length;
   console.log(`[Analysis] Average nearest neighbor distance: ${avgDistance.toFixed(4)}`);
   
   return avgDistance;
 }
 
+/**
+ * Create a Chart.js plugin that fills the whole canvas with white before drawing
+ * @returns {Object} Chart.js plugin
+ */
+function createBackgroundPlugin() {
+  return {
+    id: 'background',
+    beforeDraw: (chart) => {
+      const ctx = chart.ctx;
+      ctx.save();
+      ctx.fillStyle = 'white';
+      ctx.fillRect(0, 0, chart.width, chart.height);
+      ctx.restore();
+    }
+  };
+}
+
 /**
  * Create Z-value histogram as PNG buffer
- * @param {Array<{x: number, y: number, z: number}>} points - Array of points
+ * @param {PointCloud} points - Point cloud
+ * @param {Object} stats - Statistics object (zMin/zMax are reused so Z is scanned only once)
+ * @param {boolean} [compact=false] - Encode for the smallest size
  * @returns {Promise<Buffer>} PNG image buffer
  */
-async function createZHistogram(points) {
+async function createZHistogram(points, stats, compact = false) {
   console.log('[Visualization] Creating Z-histogram...');
   
-  // Find min/max without spread operator to avoid stack overflow
-  let zMin = Infinity;
-  let zMax = -Infinity;
-  for (const point of points) {
-    if (point.z < zMin) zMin = point.z;
-    if (point.z > zMax) zMax = point.z;
-  }
+  const zValues = points.z;
+  const { zMin, zMax } = stats;
   
   const binCount = 20;
   const binSize = (zMax - zMin) / binCount;
   
   // Create bins
-  const bins = new Array(binCount).fill(0);
+  const bins = new Uint32Array(binCount);
   const labels = [];
   
   // Generate labels
@@ -195,14 +543,15 @@ async function createZHistogram(points) {
     labels.push(binStart.toFixed(2));
   }
   
-  // Bin the points in a single pass
-  for (const point of points) {
-    const z = point.z;
-    let binIndex = Math.floor((z - zMin) / binSize);
+  // Bin the points in a single pass: multiply by a precomputed scale and
+  // truncate to an integer index (a flat cloud puts every point in the first bin)
+  const scale = binSize > 0 ? 1 / binSize : 0;
+  const lastBin = binCount - 1;
+  for (let i = 0; i < zValues.length; i++) {
+    let binIndex = ((zValues[i] - zMin) * scale) | 0;
     
-    // Handle edge case for maximum value
-    if (binIndex >= binCount) binIndex = binCount - 1;
-    if (binIndex < 0) binIndex = 0;
+    // Handle edge case for maximum value (z >= zMin, so the index is never negative)
+    if (binIndex > lastBin) binIndex = lastBin;
     
     bins[binIndex]++;
   }
@@ -210,7 +559,6 @@ async function createZHistogram(points) {
   // Create chart
   const width = 600;
   const height = 350;
-  const chartJSNodeCanvas = new ChartJSNodeCanvas({ width, height });
   
   const configuration = {
     type: 'bar',
@@ -218,7 +566,7 @@ async function createZHistogram(points) {
       labels: labels,
       datasets: [{
         label: 'Z-value Distribution',
-        data: bins,
+        data: Array.from(bins),
         backgroundColor: 'rgba(33, 150, 243, 0.6)',
         borderColor: 'rgba(33, 150, 243, 1)',
         borderWidth: 1
@@ -261,84 +609,310 @@ async function createZHistogram(points) {
         }
       }
     },
-    plugins: [{
-      id: 'background',
-      beforeDraw: (chart) => {
+    plugins: [createBackgroundPlugin()]
+  };
+  
+  const buffer = await renderChart(configuration, width, height, 'image/png', compact);
+  console.log('[Visualization] Z-histogram created');
+  
+  return buffer;
+}
+
+/**
+ * Create a Chart.js plugin that draws the depth color scale inside the chart area
+ * @param {number} zMin - Z value at the bottom of the scale
+ * @param {number} zMax - Z value at the top of the scale
+ * @returns {Object} Chart.js plugin
+ */
+function createDepthLegendPlugin(zMin, zMax) {
+  return {
+    id: 'colorLegend',
+    afterDraw: (chart) => {
+      const ctx = chart.ctx;
+      const chartArea = chart.chartArea;
+      
+      // Legend dimensions and position
+      const legendWidth = 20;
+      const legendHeight = 200;
+      const legendX = chartArea.right - legendWidth - 10;
+      const legendY = chartArea.top + (chartArea.bottom - chartArea.top - legendHeight) / 2;
+      
+      // Draw gradient
+      const gradient = ctx.createLinearGradient(legendX, legendY + legendHeight, legendX, legendY);
+      
+      // Create color stops matching the viridis-like gradient used in the data
+      const steps = 20;
+      for (let i = 0; i <= steps; i++) {
+        const [r, g, b] = depthColorComponents(i / steps);
+        gradient.addColorStop(i / steps, `rgb(${r}, ${g}, ${b})`);
+      }
+      
+      ctx.save();
+      ctx.fillStyle = gradient;
+      ctx.fillRect(legendX, legendY, legendWidth, legendHeight);
+      
+      // Draw border
+      ctx.strokeStyle = '#333';
+      ctx.lineWidth = 1;
+      ctx.strokeRect(legendX, legendY, legendWidth, legendHeight);
+      
+      // Add labels
+      ctx.fillStyle = '#333';
+      ctx.font = '10px sans-serif';
+      ctx.textAlign = 'left';
+      
+      // Max depth label (top)
+      const maxLabel = `${zMax.toFixed(2)} m`;
+      ctx.fillText(maxLabel, legendX + legendWidth + 5, legendY + 5);
+      
+      // Min depth label (bottom)
+      const minLabel = `${zMin.toFixed(2)} m`;
+      ctx.fillText(minLabel, legendX + legendWidth + 5, legendY + legendHeight);
+      
+      // Middle label
+      const midZ = (zMin + zMax) / 2;
+      const midLabel = `${midZ.toFixed(2)} m`;
+      ctx.fillText(midLabel, legendX + legendWidth + 5, legendY + legendHeight / 2);
+      
+      // "Depth (Z)" label
+      ctx.save();
+      ctx.translate(legendX - 5, legendY + legendHeight / 2);
+      ctx.rotate(-Math.PI / 2);
+      ctx.font = 'bold 11px sans-serif';
+      ctx.textAlign = 'center';
+      ctx.fillText('Depth (Z)', 0, 0);
+      ctx.restore();
+      
+      ctx.restore();
+    }
+  };
+}
+
+/**
+ * Create top-down view as PNG buffer
+ * 
+ * Every point is binned into square X-Y cells in a single pass, and each
+ * cell is colored by the mean Z of its points. The cells form a small
+ * raster (one pixel per cell) that is scaled onto the chart area, so the
+ * drawing cost does not depend on the number of points and no sampling is
+ * needed.
+ * 
+ * @param {PointCloud} points - Point cloud
+ * @param {Object} stats - Statistics from calculateStatistics (X/Y/Z ranges)
+ * @param {boolean} [compact=false] - Encode for the smallest size
+ * @returns {Promise<Buffer>} PNG image buffer
+ */
+async function createTopDownVisualization(points, stats, compact = false) {
+  console.log('[Visualization] Creating top-down Z view...');
+  
+  const { xMin, yMin, zMin, zMax } = stats;
+  const n = points.count;
+  const xs = points.x;
+  const ys = points.y;
+  const zs = points.z;
+  
+  // Square bins sized so that the longer side gets TOP_DOWN_BINS of them
+  const binSize = Math.max(stats.xExtent, stats.yExtent) / TOP_DOWN_BINS || 1;
+  const cols = Math.max(1, Math.ceil(stats.xExtent / binSize));
+  const rows = Math.max(1, Math.ceil(stats.yExtent / binSize));
+  const inverseBinSize = 1 / binSize;
+  
+  // Sum and count of Z per bin; raster rows run from the top (max Y) down
+  const zSum = new Float64Array(cols * rows);
+  const binCount = new Uint32Array(cols * rows);
+  const lastCol = cols - 1;
+  const lastRow = rows - 1;
+  for (let i = 0; i < n; i++) {
+    let col = ((xs[i] - xMin) * inverseBinSize) | 0;
+    let row = ((ys[i] - yMin) * inverseBinSize) | 0;
+    if (col > lastCol) col = lastCol;
+    if (row > lastRow) row = lastRow;
+    const bin = (lastRow - row) * cols + col;
+    zSum[bin] += zs[i];
+    binCount[bin]++;
+  }
+  
+  // Color each occupied bin by its mean Z; empty bins stay transparent
+  const { createCanvas } = getChartModules();
+  const raster = createCanvas(cols, rows);
+  const rasterCtx = raster.getContext('2d');
+  const image = rasterCtx.createImageData(cols, rows);
+  const pixels = image.data;
+  const colorScale = (DEPTH_COLORMAP_SIZE - 1) / (zMax - zMin || 1);
+  for (let bin = 0; bin < binCount.length; bin++) {
+    if (binCount[bin] === 0) continue;
+    // Clamp against rounding of the mean just outside [zMin, zMax]
+    const level = Math.round((zSum[bin] / binCount[bin] - zMin) * colorScale);
+    const c = Math.max(0, Math.min(DEPTH_COLORMAP_SIZE - 1, level)) * 3;
+    const p = bin * 4;
+    pixels[p] = DEPTH_RASTER_RGB[c];
+    pixels[p + 1] = DEPTH_RASTER_RGB[c + 1];
+    pixels[p + 2] = DEPTH_RASTER_RGB[c + 2];
+    pixels[p + 3] = 255;
+  }
+  rasterCtx.putImageData(image, 0, 0);
+  
+  // Data extent covered by the raster
+  const rasterXMax = xMin + cols * binSize;
+  const rasterYMax = yMin + rows * binSize;
+  
+  const width = 600;
+  const height = 450;
+  
+  const configuration = {
+    type: 'scatter',
+    data: {
+      // The binned raster is drawn by the zRaster plugin
+      datasets: [{
+        label: 'Mean Z',
+        data: []
+      }]
+    },
+    options: {
+      responsive: false,
+      plugins: {
+        title: {
+          display: true,
+          text: 'Top-Down View (Mean Z per Cell)',
+          font: { size: 14, weight: 'bold' }
+        },
+        legend: {
+          display: false
+        }
+      },
+      scales: {
+        x: {
+          suggestedMin: xMin,
+          suggestedMax: rasterXMax,
+          title: {
+            display: true,
+            text: 'X (meters)',
+            font: { size: 11 }
+          },
+          ticks: {
+            font: { size: 9 }
+          }
+        },
+        y: {
+          suggestedMin: yMin,
+          suggestedMax: rasterYMax,
+          title: {
+            display: true,
+            text: 'Y (meters)',
+            font: { size: 11 }
+          },
+          ticks: {
+            font: { size: 9 }
+          }
+        }
+      }
+    },
+    plugins: [createBackgroundPlugin(), {
+      id: 'zRaster',
+      beforeDatasetsDraw: (chart) => {
         const ctx = chart.ctx;
+        const { left, top, right, bottom } = chart.chartArea;
+        const x0 = chart.scales.x.getPixelForValue(xMin);
+        const x1 = chart.scales.x.getPixelForValue(rasterXMax);
+        const y0 = chart.scales.y.getPixelForValue(rasterYMax);
+        const y1 = chart.scales.y.getPixelForValue(yMin);
+        
         ctx.save();
-        ctx.fillStyle = 'white';
-        ctx.fillRect(0, 0, chart.width, chart.height);
+        ctx.beginPath();
+        ctx.rect(left, top, right - left, bottom - top);
+        ctx.clip();
+        // Scale cells up as sharp blocks instead of blurring them together
+        ctx.imageSmoothingEnabled = false;
+        ctx.drawImage(raster, x0, y0, x1 - x0, y1 - y0);
         ctx.restore();
       }
-    }]
+    },
+    createDepthLegendPlugin(zMin, zMax)]
   };
   
-  const buffer = await chartJSNodeCanvas.renderToBuffer(configuration);
-  console.log('[Visualization] Z-histogram created');
+  const buffer = await renderChart(configuration, width, height, 'image/png', compact);
+  console.log(`[Visualization] Top-down view created (${cols}x${rows} cells)`);
   
   return buffer;
 }
 
 /**
- * Create 3D visualization as PNG buffer (simplified 2D projection)
- * @param {Array<{x: number, y: number, z: number}>} points - Array of points
- * @returns {Promise<Buffer>} PNG image buffer
+ * Create 3D visualization as JPEG buffer (simplified 2D projection)
+ * 
+ * This is the scatter plot of up to 50,000 sampled points used before the
+ * top-down view; reports only use it when the legacy3D option is set.
+ * The dense scatter plot compresses far better (and faster) as JPEG than as
+ * PNG; the histogram stays PNG because of its sharp bar edges.
+ * 
+ * @param {PointCloud} points - Point cloud
+ * @param {boolean} [compact=false] - Encode at a lower JPEG quality
+ * @returns {Promise<Buffer>} JPEG image buffer
  */
-async function create3DVisualization(points) {
+async function create3DVisualization(points, compact = false) {
   console.log('[Visualization] Creating 3D point cloud visualization...');
   
   // Downsample for visualization if needed
-  let visPoints = points;
-  if (points.length > 50000) {
-    visPoints = [];
-    const step = Math.ceil(points.length / 50000);
-    for (let i = 0; i < points.length; i += step) {
-      visPoints.push(points[i]);
-    }
-    console.log(`[Visualization] Downsampled to ${visPoints.length} points for visualization`);
+  const visIndices = randomSampleIndices(points.count, 50000, getSamplingRandom());
+  const visCount = visIndices.length;
+  if (points.count > 50000) {
+    console.log(`[Visualization] Downsampled to ${visCount} points for visualization`);
   }
   
-  // Get Z range for coloring without spread operator to avoid stack overflow
-  let zMin = Infinity;
-  let zMax = -Infinity;
-  for (const point of visPoints) {
-    if (point.z < zMin) zMin = point.z;
-    if (point.z > zMax) zMax = point.z;
+  // Gather sampled coordinates and their X/Y/Z ranges in one pass
+  const visX = new Float64Array(visCount);
+  const visY = new Float64Array(visCount);
+  const visZ = new Float64Array(visCount);
+  let xMin = Infinity, xMax = -Infinity;
+  let yMin = Infinity, yMax = -Infinity;
+  let zMin = Infinity, zMax = -Infinity;
+  for (let i = 0; i < visCount; i++) {
+    const idx = visIndices[i];
+    const x = points.x[idx];
+    const y = points.y[idx];
+    const z = points.z[idx];
+    visX[i] = x;
+    visY[i] = y;
+    visZ[i] = z;
+    if (x < xMin) xMin = x;
+    if (x > xMax) xMax = x;
+    if (y < yMin) yMin = y;
+    if (y > yMax) yMax = y;
+    if (z < zMin) zMin = z;
+    if (z > zMax) zMax = z;
   }
   const zRange = zMax - zMin || 1;
   
   // Create scatter plot with color based on Z
   const width = 600;
   const height = 450;
-  const chartJSNodeCanvas = new ChartJSNodeCanvas({ width, height });
-  
-  // Prepare data with colors based on Z values
-  const data = visPoints.map(p => {
-    // Normalize Z to 0-1 range
-    const normalized = (p.z - zMin) / zRange;
-    // Use viridis-like color gradient (simplified)
-    const r = Math.floor(255 * Math.max(0, Math.min(1, 1.5 - Math.abs(normalized - 0.5) * 2)));
-    const g = Math.floor(255 * normalized);
-    const b = Math.floor(255 * (1 - normalized));
-    const color = `rgba(${r}, ${g}, ${b}, 0.6)`;
-    
-    return {
-      x: p.x,
-      y: p.y,
-      backgroundColor: color,
-      borderColor: color
-    };
-  });
+  
+  // Group points by quantized depth color (counting sort) so that each color
+  // is drawn as a single path; higher points are drawn last, on top
+  const colorScale = (DEPTH_COLORMAP_SIZE - 1) / zRange;
+  const colorIndex = new Uint8Array(visCount);
+  const bucketStart = new Int32Array(DEPTH_COLORMAP_SIZE + 1);
+  for (let i = 0; i < visCount; i++) {
+    const c = Math.round((visZ[i] - zMin) * colorScale);
+    colorIndex[i] = c;
+    bucketStart[c + 1]++;
+  }
+  for (let c = 0; c < DEPTH_COLORMAP_SIZE; c++) {
+    bucketStart[c + 1] += bucketStart[c];
+  }
+  const drawOrder = new Int32Array(visCount);
+  const bucketFill = bucketStart.slice(0, DEPTH_COLORMAP_SIZE);
+  for (let i = 0; i < visCount; i++) {
+    drawOrder[bucketFill[colorIndex[i]]++] = i;
+  }
   
   const configuration = {
     type: 'scatter',
     data: {
+      // Points are rasterized by the pointRaster plugin instead of being
+      // turned into one Chart.js point element each
       datasets: [{
         label: 'Point Cloud',
-        data: data,
-        pointRadius: 2,
-        pointBackgroundColor: data.map(d => d.backgroundColor),
-        pointBorderColor: data.map(d => d.borderColor)
+        data: []
       }]
     },
     options: {
@@ -355,6 +929,8 @@ async function create3DVisualization(points) {
       },
       scales: {
         x: {
+          suggestedMin: xMin,
+          suggestedMax: xMax,
           title: {
             display: true,
             text: 'X (meters)',
@@ -365,6 +941,8 @@ async function create3DVisualization(points) {
           }
         },
         y: {
+          suggestedMin: yMin,
+          suggestedMax: yMax,
           title: {
             display: true,
             text: 'Y (meters)',
@@ -376,83 +954,44 @@ async function create3DVisualization(points) {
         }
       }
     },
-    plugins: [{
-      id: 'background',
-      beforeDraw: (chart) => {
-        const ctx = chart.ctx;
-        ctx.save();
-        ctx.fillStyle = 'white';
-        ctx.fillRect(0, 0, chart.width, chart.height);
-        ctx.restore();
-      }
-    },
-    {
-      id: 'colorLegend',
-      afterDraw: (chart) => {
+    plugins: [createBackgroundPlugin(), {
+      id: 'pointRaster',
+      beforeDatasetsDraw: (chart) => {
         const ctx = chart.ctx;
-        const chartArea = chart.chartArea;
-        
-        // Legend dimensions and position
-        const legendWidth = 20;
-        const legendHeight = 200;
-        const legendX = chartArea.right - legendWidth - 10;
-        const legendY = chartArea.top + (chartArea.bottom - chartArea.top - legendHeight) / 2;
-        
-        // Draw gradient
-        const gradient = ctx.createLinearGradient(legendX, legendY + legendHeight, legendX, legendY);
-        
-        // Create color stops matching the viridis-like gradient used in the data
-        const steps = 20;
-        for (let i = 0; i <= steps; i++) {
-          const normalized = i / steps;
-          const r = Math.floor(255 * Math.max(0, Math.min(1, 1.5 - Math.abs(normalized - 0.5) * 2)));
-          const g = Math.floor(255 * normalized);
-          const b = Math.floor(255 * (1 - normalized));
-          gradient.addColorStop(i / steps, `rgb(${r}, ${g}, ${b})`);
-        }
+        const { left, top, right, bottom } = chart.chartArea;
+        const xScale = chart.scales.x;
+        const yScale = chart.scales.y;
+        const radius = 2;
         
         ctx.save();
-        ctx.fillStyle = gradient;
-        ctx.fillRect(legendX, legendY, legendWidth, legendHeight);
-        
-        // Draw border
-        ctx.strokeStyle = '#333';
-        ctx.lineWidth = 1;
-        ctx.strokeRect(legendX, legendY, legendWidth, legendHeight);
-        
-        // Add labels
-        ctx.fillStyle = '#333';
-        ctx.font = '10px sans-serif';
-        ctx.textAlign = 'left';
-        
-        // Max depth label (top)
-        const maxLabel = `${zMax.toFixed(2)} m`;
-        ctx.fillText(maxLabel, legendX + legendWidth + 5, legendY + 5);
-        
-        // Min depth label (bottom)
-        const minLabel = `${zMin.toFixed(2)} m`;
-        ctx.fillText(minLabel, legendX + legendWidth + 5, legendY + legendHeight);
+        ctx.beginPath();
+        ctx.rect(left, top, right - left, bottom - top);
+        ctx.clip();
         
-        // Middle label
-        const midZ = (zMin + zMax) / 2;
-        const midLabel = `${midZ.toFixed(2)} m`;
-        ctx.fillText(midLabel, legendX + legendWidth + 5, legendY + legendHeight / 2);
-        
-        // "Depth (Z)" label
-        ctx.save();
-        ctx.translate(legendX - 5, legendY + legendHeight / 2);
-        ctx.rotate(-Math.PI / 2);
-        ctx.font = 'bold 11px sans-serif';
-        ctx.textAlign = 'center';
-        ctx.fillText('Depth (Z)', 0, 0);
-        ctx.restore();
+        for (let c = 0; c < DEPTH_COLORMAP_SIZE; c++) {
+          const start = bucketStart[c];
+          const end = bucketStart[c + 1];
+          if (start === end) continue;
+          
+          ctx.fillStyle = DEPTH_POINT_COLORS[c];
+          ctx.beginPath();
+          for (let k = start; k < end; k++) {
+            const i = drawOrder[k];
+            const px = xScale.getPixelForValue(visX[i]);
+            const py = yScale.getPixelForValue(visY[i]);
+            ctx.moveTo(px + radius, py);
+            ctx.arc(px, py, radius, 0, 2 * Math.PI);
+          }
+          ctx.fill();
+        }
         
         ctx.restore();
       }
-    }]
+    },
+    createDepthLegendPlugin(zMin, zMax)]
   };
   
-  const buffer = await chartJSNodeCanvas.renderToBuffer(configuration);
+  const buffer = await renderChart(configuration, width, height, 'image/jpeg', compact);
   console.log('[Visualization] 3D visualization created');
   
   return buffer;
@@ -510,19 +1049,21 @@ function readMetadata(metadataFilePath) {
 
 /**
  * Generate PDF report
- * @param {Array<{x: number, y: number, z: number}>} points - Array of points
+ * @param {PointCloud} points - Point cloud
  * @param {Object} stats - Statistics object
  * @param {number} avgNNDistance - Average nearest neighbor distance
  * @param {Buffer} histogramBuffer - Histogram image buffer
- * @param {Buffer} vizBuffer - 3D visualization image buffer
- * @param {string} outputPath - Path where PDF will be saved
+ * @param {Buffer} vizBuffer - Top-down (or legacy 3D) visualization image buffer
  * @param {string} originalFilename - Original input filename
  * @param {Array<string>|null} metadata - Optional metadata lines to include in report
- * @returns {Promise<string>} Output path
+ * @returns {Promise<Buffer>} PDF document, built in memory
  */
-async function generatePDFReport(points, stats, avgNNDistance, histogramBuffer, vizBuffer, outputPath, originalFilename, metadata = null) {
+async function generatePDFReport(points, stats, avgNNDistance, histogramBuffer, vizBuffer, originalFilename, metadata = null) {
   console.log('[Report] Generating PDF report...');
   
+  // Loaded here so that only runs which get as far as the PDF load pdfkit
+  const PDFDocument = require('pdfkit');
+  
   return new Promise((resolve, reject) => {
     try {
       const doc = new PDFDocument({
@@ -530,8 +1071,22 @@ async function generatePDFReport(points, stats, avgNNDistance, histogramBuffer,
         margins: { top: 36, bottom: 36, left: 43, right: 43 }
       });
       
-      const stream = fs.createWriteStream(outputPath);
-      doc.pipe(stream);
+      // Collect the document in memory; the caller writes it to disk once
+      const chunks = [];
+      doc.on('data', chunk => chunks.push(chunk));
+      doc.on('end', () => {
+        const pdfBuffer = Buffer.concat(chunks);
+        const fileSizeMB = pdfBuffer.length / (1024 * 1024);
+        console.log('[Report] PDF generated successfully');
+        console.log(`[Report] File size: ${fileSizeMB.toFixed(2)} MB`);
+        
+        if (pdfBuffer.length > MAX_REPORT_SIZE_BYTES) {
+          console.log('[Report] WARNING: File size exceeds 2 MB limit!');
+        }
+        
+        resolve(pdfBuffer);
+      });
+      doc.on('error', reject);
       
       // Title
       doc.fontSize(16)
@@ -556,7 +1111,7 @@ async function generatePDFReport(points, stats, avgNNDistance, histogramBuffer,
          .font('Helvetica')
          .text(
            'This report provides a statistical analysis and visualization of the uploaded point cloud data, ' +
-           'including spatial extent, distribution metrics, and 3D visualization with height-based coloring.',
+           'including spatial extent, distribution metrics, and an X-Y view with height-based coloring.',
            { align: 'left' }
          );
       
@@ -678,35 +1233,39 @@ async function generatePDFReport(points, stats, avgNNDistance, histogramBuffer,
       
       doc.end();
       
-      stream.on('finish', () => {
-        const stats = fs.statSync(outputPath);
-        const fileSizeMB = stats.size / (1024 * 1024);
-        console.log(`[Report] PDF generated successfully: ${outputPath}`);
-        console.log(`[Report] File size: ${fileSizeMB.toFixed(2)} MB`);
-        
-        if (fileSizeMB > 2.0) {
-          console.log('[Report] WARNING: File size exceeds 2 MB limit!');
-        }
-        
-        resolve(outputPath);
-      });
-      
-      stream.on('error', reject);
-      
     } catch (error) {
       reject(error);
     }
   });
 }
 
+/**
+ * Create the histogram and point cloud images for a report
+ * @param {PointCloud} points - Point cloud
+ * @param {Object} stats - Statistics object
+ * @param {boolean} legacy3D - Use the sampled X-Y scatter plot instead of the top-down view
+ * @param {boolean} [compact=false] - Encode the images for the smallest size
+ * @returns {Promise<Buffer[]>} Histogram and point cloud image buffers
+ */
+function createVisualizations(points, stats, legacy3D, compact = false) {
+  return Promise.all([
+    createZHistogram(points, stats, compact),
+    legacy3D ? create3DVisualization(points, compact) : createTopDownVisualization(points, stats, compact)
+  ]);
+}
+
 /**
  * Main function to generate report
  * @param {string} inputFile - Path to input XYZ file
  * @param {string} outputFile - Path to output PDF file
  * @param {string} originalFilename - Original filename for display in report
+ * @param {Object} options - Report options
+ * @param {boolean} [options.legacy3D=false] - Use the sampled X-Y scatter plot instead of the top-down view
  * @returns {Promise<Object>} Result object with success status
  */
-async function generateReport(inputFile, outputFile, originalFilename = null) {
+async function generateReport(inputFile, outputFile, originalFilename = null, options = {}) {
+  const { legacy3D = false } = options;
+  
   console.log('\n' + '='.repeat(60));
   console.log('POINT CLOUD ANALYSIS AND REPORT GENERATION (JavaScript)');
   console.log('='.repeat(60));
@@ -718,12 +1277,17 @@ async function generateReport(inputFile, outputFile, originalFilename = null) {
     // Calculate statistics
     const stats = calculateStatistics(points);
     
-    // Calculate average nearest neighbor distance
+    // Create visualizations. Both charts are drawn immediately; their image
+    // encoding then runs on the libuv thread pool in the background
+    const visualizations = createVisualizations(points, stats, legacy3D);
+    // If a later step throws before the images are awaited, a failed encode
+    // must not surface as an unhandled rejection (which would stop the server)
+    visualizations.catch(() => {});
+    
+    // Calculate average nearest neighbor distance while the images are encoded
     const avgNNDistance = calculateNearestNeighborDistance(points);
     
-    // Create visualizations
-    const histogramBuffer = await createZHistogram(points);
-    const vizBuffer = await create3DVisualization(points);
+    const [histogramBuffer, vizBuffer] = await visualizations;
     
     // ========================================
     // METADATA FILE HANDLING
@@ -750,21 +1314,35 @@ async function generateReport(inputFile, outputFile, originalFilename = null) {
     
     // Step 3: Generate PDF report with or without metadata
     const displayFilename = originalFilename || path.basename(inputFile);
-    await generatePDFReport(
+    let pdfBuffer = await generatePDFReport(
       points, stats, avgNNDistance,
       histogramBuffer, vizBuffer,
-      outputFile, displayFilename, metadata
+      displayFilename, metadata
     );
     
+    // Over the size limit: rebuild once with more strongly compressed images
+    if (pdfBuffer.length > MAX_REPORT_SIZE_BYTES) {
+      console.log('[Report] Re-encoding images with stronger compression...');
+      const [compactHistogram, compactViz] = await createVisualizations(points, stats, legacy3D, true);
+      pdfBuffer = await generatePDFReport(
+        points, stats, avgNNDistance,
+        compactHistogram, compactViz,
+        displayFilename, metadata
+      );
+    }
+    
+    // Step 4: Write the finished PDF to disk in a single write
+    await fs.promises.writeFile(outputFile, pdfBuffer);
+    console.log(`[Report] Saved report to: ${outputFile}`);
+    
     console.log('='.repeat(60));
     console.log('REPORT GENERATION COMPLETED SUCCESSFULLY');
     console.log('='.repeat(60) + '\n');
     
-    const fileStats = fs.statSync(outputFile);
     return {
       success: true,
       outputFile: outputFile,
-      fileSizeMB: parseFloat((fileStats.size / (1024 * 1024)).toFixed(2)),
+      fileSizeMB: parseFloat((pdfBuffer.length / (1024 * 1024)).toFixed(2)),
       pointCount: stats.count
     };
     
@@ -780,15 +1358,17 @@ async function generateReport(inputFile, outputFile, originalFilename = null) {
 // If run directly (not imported as module)
 if (require.main === module) {
   const args = process.argv.slice(2);
+  const legacy3D = args.includes('--legacy-3d');
+  const files = args.filter(arg => arg !== '--legacy-3d');
   
-  if (args.length < 2) {
-    console.error('Usage: node generateReport.js <input_file> <output_file>');
+  if (files.length < 2) {
+    console.error('Usage: node generateReport.js <input_file> <output_file> [--legacy-3d]');
     process.exit(1);
   }
   
-  const [inputFile, outputFile] = args;
+  const [inputFile, outputFile] = files;
   
-  generateReport(inputFile, outputFile)
+  generateReport(inputFile, outputFile, null, { legacy3D })
     .then(result => {
       console.log('JSON_RESULT:' + JSON.stringify(result));
       process.exit(result.success ? 0 : 1);
@@ -800,4 +1380,4 @@ if (require.main === module) {
     });
 }
 
-module.exports = { generateReport, readMetadata };
+module.exports = { generateReport, readMetadata, parseXYZFile };
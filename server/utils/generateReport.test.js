@@ -5,11 +5,17 @@
  * 1. Metadata files are correctly read when they exist
  * 2. Metadata files are correctly created when they don't exist
  * 3. PDF generation works with and without metadata
+ * 4. XYZ files with mixed separators, comments and invalid rows are parsed
+ * 5. Nearest neighbor indices (uniform grid, KD-tree) match brute force
+ * 6. Random point sampling is valid and reproducible with a seed
  */
 
 const fs = require('fs');
 const path = require('path');
-const { generateReport, readMetadata } = require('./generateReport');
+const { generateReport, readMetadata, parseXYZFile } = require('./generateReport');
+const { buildKdTree, nearestNeighborSquaredDistance } = require('./kdTree');
+const { buildUniformGrid, gridNearestNeighborSquaredDistance } = require('./spatialGrid');
+const { createSeededRandom, randomSampleIndices } = require('./sampling');
 
 // Test directory for temporary files
 const TEST_DIR = path.join(__dirname, '../../test-temp');
@@ -329,6 +335,201 @@ async function testEmptyMetadataFile() {
   }
 }
 
+/**
+ * Test 6: Verify XYZ parsing of mixed separators, comments and invalid rows
+ */
+async function testParseMixedXYZFile() {
+  console.log('\n=== Test 6: Parse Mixed XYZ File ===');
+  
+  try {
+    setupTestEnvironment();
+    
+    // Comments, blank lines, CRLF, commas, tabs, exponents and invalid rows
+    const content = [
+      '# Header comment',
+      '1 2 3\r',
+      '',
+      '  4.5,5.25,-6',
+      '7\t8\t9 extra',
+      'bad 1 2',
+      '1e3 2E-2 .5',
+      '1 2',
+      '1 2 Infinity'
+    ].join('\n');
+    fs.writeFileSync(TEST_DATA_FILE, content, 'utf-8');
+    console.log('✓ Created mixed XYZ file');
+    
+    const points = parseXYZFile(TEST_DATA_FILE);
+    const expected = [
+      { x: 1, y: 2, z: 3 },
+      { x: 4.5, y: 5.25, z: -6 },
+      { x: 7, y: 8, z: 9 },
+      { x: 1000, y: 0.02, z: 0.5 }
+    ];
+    
+    if (points.count !== expected.length) {
+      throw new Error(`Expected ${expected.length} points, got ${points.count}`);
+    }
+    console.log(`✓ Parsed correct number of points: ${points.count}`);
+    
+    for (let i = 0; i < expected.length; i++) {
+      const p = { x: points.x[i], y: points.y[i], z: points.z[i] };
+      const e = expected[i];
+      if (p.x !== e.x || p.y !== e.y || p.z !== e.z) {
+        throw new Error(`Point ${i + 1} mismatch: expected ${JSON.stringify(e)}, got ${JSON.stringify(p)}`);
+      }
+    }
+    console.log('✓ All parsed points match expected values');
+    
+    console.log('\n✅ Test 6 PASSED: Mixed XYZ file is parsed correctly\n');
+    return true;
+    
+  } catch (error) {
+    console.error('\n❌ Test 6 FAILED:', error.message);
+    return false;
+  } finally {
+    cleanupTestEnvironment();
+  }
+}
+
+/**
+ * Test 7: Verify nearest neighbor indices against a brute-force search
+ */
+async function testNearestNeighborIndices() {
+  console.log('\n=== Test 7: Nearest Neighbor Indices ===');
+  
+  try {
+    const random = createSeededRandom(7);
+    const n = 1500;
+    
+    // Small clouds covering flat axes, duplicates, clustering and UTM offsets
+    const clouds = {
+      uniform: () => [random() * 10, random() * 10, random()],
+      flat: () => [random() * 100, random() * 5, 0],
+      collinear: () => [random(), 0, 0],
+      duplicates: () => [Math.floor(random() * 4), Math.floor(random() * 4), 1],
+      clustered: () => (random() < 0.95
+        ? [random() * 0.01, random() * 0.01, random() * 0.01]
+        : [random() * 1000, random() * 1000, random() * 1000]),
+      utm: () => [500000 + random() * 50, 5500000 + random() * 50, 100 + random()]
+    };
+    
+    for (const [name, generate] of Object.entries(clouds)) {
+      const x = new Float64Array(n);
+      const y = new Float64Array(n);
+      const z = new Float64Array(n);
+      const indices = new Int32Array(n);
+      for (let i = 0; i < n; i++) {
+        [x[i], y[i], z[i]] = generate();
+        indices[i] = i;
+      }
+      
+      const grid = buildUniformGrid(x, y, z, indices);
+      const tree = buildKdTree(x, y, z, indices, { leafSize: 8 });
+      
+      for (let i = 0; i < n; i++) {
+        let expected = Infinity;
+        for (let j = 0; j < n; j++) {
+          if (j === i) continue;
+          const dx = x[j] - x[i];
+          const dy = y[j] - y[i];
+          const dz = z[j] - z[i];
+          expected = Math.min(expected, dx * dx + dy * dy + dz * dz);
+        }
+        
+        const fromGrid = gridNearestNeighborSquaredDistance(grid, x[i], y[i], z[i], i);
+        const fromTree = nearestNeighborSquaredDistance(tree, x[i], y[i], z[i], i);
+        if (fromGrid !== expected || fromTree !== expected) {
+          throw new Error(`${name} cloud, point ${i}: expected ${expected}, grid ${fromGrid}, KD-tree ${fromTree}`);
+        }
+      }
+      console.log(`✓ Grid and KD-tree match brute force on ${name} cloud`);
+      
+      // Without excludeIndex the query point finds itself
+      if (gridNearestNeighborSquaredDistance(grid, x[0], y[0], z[0]) !== 0 ||
+          nearestNeighborSquaredDistance(tree, x[0], y[0], z[0]) !== 0) {
+        throw new Error(`${name} cloud: query point was not found without excludeIndex`);
+      }
+    }
+    console.log('✓ Query point is only skipped when passed as excludeIndex');
+    
+    // Extents that overflow: no grid, and the KD-tree still terminates
+    const huge = new Float64Array([-1.5e308, 1.5e308, 1e308, 1.7e308]);
+    const zeros = new Float64Array(huge.length);
+    const hugeIndices = Int32Array.from([0, 1, 2, 3]);
+    if (buildUniformGrid(huge, zeros, zeros, hugeIndices) !== null) {
+      throw new Error('Expected no grid for a cloud with a non-finite extent');
+    }
+    const hugeTree = buildKdTree(huge, zeros, zeros, hugeIndices, { leafSize: 1 });
+    const hugeNearest = nearestNeighborSquaredDistance(hugeTree, huge[2], 0, 0, 2);
+    if (hugeNearest !== (huge[3] - huge[2]) ** 2) {
+      throw new Error(`Unexpected nearest neighbor distance for huge coordinates: ${hugeNearest}`);
+    }
+    console.log('✓ Huge coordinates fall back from the grid and the KD-tree terminates');
+    
+    console.log('\n✅ Test 7 PASSED: Nearest neighbor indices match brute force\n');
+    return true;
+    
+  } catch (error) {
+    console.error('\n❌ Test 7 FAILED:', error.message);
+    return false;
+  }
+}
+
+/**
+ * Test 8: Verify random index sampling and seeded random numbers
+ */
+async function testRandomSampleIndices() {
+  console.log('\n=== Test 8: Random Sample Indices ===');
+  
+  try {
+    const n = 10000;
+    const k = 5000;
+    const sample = randomSampleIndices(n, k, createSeededRandom(42));
+    
+    if (sample.length !== k) {
+      throw new Error(`Expected ${k} indices, got ${sample.length}`);
+    }
+    for (let i = 0; i < sample.length; i++) {
+      if (sample[i] < 0 || sample[i] >= n) {
+        throw new Error(`Index out of range: ${sample[i]}`);
+      }
+      if (i > 0 && sample[i] <= sample[i - 1]) {
+        throw new Error(`Indices not distinct and sorted at position ${i}`);
+      }
+    }
+    console.log('✓ Sampled indices are distinct, sorted and in range');
+    
+    // k >= n selects every index; k = 0 selects none
+    const all = randomSampleIndices(5, 8);
+    if (all.join(',') !== '0,1,2,3,4') {
+      throw new Error(`Expected all indices for k >= n, got ${all.join(',')}`);
+    }
+    if (randomSampleIndices(5, 0).length !== 0) {
+      throw new Error('Expected no indices for k = 0');
+    }
+    console.log('✓ k >= n and k = 0 are handled');
+    
+    // The same seed gives the same sample; a different seed does not
+    const again = randomSampleIndices(n, k, createSeededRandom(42));
+    const other = randomSampleIndices(n, k, createSeededRandom(43));
+    if (again.join(',') !== sample.join(',')) {
+      throw new Error('Same seed produced a different sample');
+    }
+    if (other.join(',') === sample.join(',')) {
+      throw new Error('Different seeds produced the same sample');
+    }
+    console.log('✓ Seeded sampling is reproducible');
+    
+    console.log('\n✅ Test 8 PASSED: Random sampling is valid and reproducible\n');
+    return true;
+    
+  } catch (error) {
+    console.error('\n❌ Test 8 FAILED:', error.message);
+    return false;
+  }
+}
+
 /**
  * Main test runner
  */
@@ -345,6 +546,9 @@ async function runAllTests() {
   results.push(await testReportGenerationWithMetadata());
   results.push(await testMetadataFileCreation());
   results.push(await testEmptyMetadataFile());
+  results.push(await testParseMixedXYZFile());
+  results.push(await testNearestNeighborIndices());
+  results.push(await testRandomSampleIndices());
   
   // Summary
   console.log('='.repeat(60));
@@ -381,5 +585,8 @@ module.exports = {
   testReportGenerationWithMetadata,
   testMetadataFileCreation,
   testEmptyMetadataFile,
+  testParseMixedXYZFile,
+  testNearestNeighborIndices,
+  testRandomSampleIndices,
   runAllTests
 };
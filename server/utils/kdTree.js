@@ -0,0 +1,204 @@
+/**
+ * KD-tree for nearest neighbor queries on structure-of-arrays point clouds
+ * @module kdTree
+ */
+
+// Default number of points stored in a leaf before it is split
+const DEFAULT_LEAF_SIZE = 32;
+
+/**
+ * Build a KD-tree over a subset of points
+ * 
+ * Nodes are split at the midpoint of the widest side of their cell instead
+ * of at the median, so no selection pass is needed while building. Cell
+ * bounds are inherited from the parent split rather than shrunk to the points
+ * they contain. If a midpoint split would leave one side empty, the split is
+ * moved to the midpoint of the points' actual extent.
+ * 
+ * @param {Float64Array} x - X coordinates
+ * @param {Float64Array} y - Y coordinates
+ * @param {Float64Array} z - Z coordinates
+ * @param {Array<number>|Int32Array} indices - Indices of the points to insert
+ * @param {Object} options - Build options
+ * @param {number} [options.leafSize=32] - Maximum number of points per leaf
+ * @returns {Object} KD-tree
+ */
+function buildKdTree(x, y, z, indices, options = {}) {
+  const { leafSize = DEFAULT_LEAF_SIZE } = options;
+  const coords = [x, y, z];
+  const order = Int32Array.from(indices);
+  
+  // Flat node storage; axis -1 marks a leaf covering order[start..end)
+  const nodeAxis = [];
+  const nodeSplit = [];
+  const nodeLeft = [];
+  const nodeRight = [];
+  const nodeStart = [];
+  const nodeEnd = [];
+  
+  function addNode(start, end) {
+    nodeAxis.push(-1);
+    nodeSplit.push(0);
+    nodeLeft.push(-1);
+    nodeRight.push(-1);
+    nodeStart.push(start);
+    nodeEnd.push(end);
+    return nodeAxis.length - 1;
+  }
+  
+  // Partition order[start..end) so that coordinates below split come first
+  function partition(values, start, end, split) {
+    let i = start;
+    let j = end - 1;
+    while (i <= j) {
+      if (values[order[i]] < split) {
+        i++;
+      } else {
+        const tmp = order[i];
+        order[i] = order[j];
+        order[j] = tmp;
+        j--;
+      }
+    }
+    return i;
+  }
+  
+  // Root cell is the bounding box of all inserted points
+  const rootMin = [Infinity, Infinity, Infinity];
+  const rootMax = [-Infinity, -Infinity, -Infinity];
+  for (let i = 0; i < order.length; i++) {
+    const idx = order[i];
+    for (let axis = 0; axis < 3; axis++) {
+      const v = coords[axis][idx];
+      if (v < rootMin[axis]) rootMin[axis] = v;
+      if (v > rootMax[axis]) rootMax[axis] = v;
+    }
+  }
+  
+  const root = addNode(0, order.length);
+  const stack = [{ node: root, min: rootMin, max: rootMax }];
+  
+  while (stack.length > 0) {
+    const { node, min, max } = stack.pop();
+    const start = nodeStart[node];
+    const end = nodeEnd[node];
+    if (end - start <= leafSize) continue;
+    
+    // Midpoint of the widest side of the cell
+    let axis = 0;
+    for (let a = 1; a < 3; a++) {
+      if (max[a] - min[a] > max[axis] - min[axis]) axis = a;
+    }
+    // Halve before adding so that large bounds of the same sign do not overflow
+    let split = min[axis] / 2 + max[axis] / 2;
+    let mid = partition(coords[axis], start, end, split);
+    
+    if (mid === start || mid === end) {
+      // Slide the split to the midpoint of the points' actual extent
+      const lo = [Infinity, Infinity, Infinity];
+      const hi = [-Infinity, -Infinity, -Infinity];
+      for (let i = start; i < end; i++) {
+        const idx = order[i];
+        for (let a = 0; a < 3; a++) {
+          const v = coords[a][idx];
+          if (v < lo[a]) lo[a] = v;
+          if (v > hi[a]) hi[a] = v;
+        }
+      }
+      axis = 0;
+      for (let a = 1; a < 3; a++) {
+        if (hi[a] - lo[a] > hi[axis] - lo[axis]) axis = a;
+      }
+      // All points are duplicates: keep them in one leaf
+      if (hi[axis] - lo[axis] === 0) continue;
+      
+      split = lo[axis] / 2 + hi[axis] / 2;
+      // Guard against the midpoint rounding down onto the lower value
+      if (split <= lo[axis]) split = hi[axis];
+      mid = partition(coords[axis], start, end, split);
+      // Still no split (e.g. non-finite bounds): keep the points in one leaf
+      if (mid === start || mid === end) continue;
+    }
+    
+    const left = addNode(start, mid);
+    const right = addNode(mid, end);
+    nodeAxis[node] = axis;
+    nodeSplit[node] = split;
+    nodeLeft[node] = left;
+    nodeRight[node] = right;
+    
+    const leftMax = max.slice();
+    leftMax[axis] = split;
+    const rightMin = min.slice();
+    rightMin[axis] = split;
+    stack.push({ node: left, min, max: leftMax });
+    stack.push({ node: right, min: rightMin, max });
+  }
+  
+  return {
+    x, y, z,
+    order,
+    nodeAxis: Int32Array.from(nodeAxis),
+    nodeSplit: Float64Array.from(nodeSplit),
+    nodeLeft: Int32Array.from(nodeLeft),
+    nodeRight: Int32Array.from(nodeRight),
+    nodeStart: Int32Array.from(nodeStart),
+    nodeEnd: Int32Array.from(nodeEnd)
+  };
+}
+
+/**
+ * Find the squared distance from a point to its nearest neighbor in the tree
+ * @param {Object} tree - KD-tree created by buildKdTree
+ * @param {number} qx - Query X coordinate
+ * @param {number} qy - Query Y coordinate
+ * @param {number} qz - Query Z coordinate
+ * @param {number} [excludeIndex=-1] - Point index to ignore (the query point itself)
+ * @returns {number} Squared nearest neighbor distance (Infinity if none found)
+ */
+function nearestNeighborSquaredDistance(tree, qx, qy, qz, excludeIndex = -1) {
+  const { x, y, z, order, nodeAxis, nodeSplit, nodeLeft, nodeRight, nodeStart, nodeEnd } = tree;
+  const query = [qx, qy, qz];
+  let best = Infinity;
+  
+  // Pending nodes with the squared distance to their splitting plane
+  const stackNodes = [0];
+  const stackDist = [0];
+  
+  while (stackNodes.length > 0) {
+    const node = stackNodes.pop();
+    const planeDist = stackDist.pop();
+    if (planeDist >= best) continue;
+    
+    const axis = nodeAxis[node];
+    if (axis === -1) {
+      for (let i = nodeStart[node]; i < nodeEnd[node]; i++) {
+        const idx = order[i];
+        if (idx === excludeIndex) continue;
+        const dx = x[idx] - qx;
+        const dy = y[idx] - qy;
+        const dz = z[idx] - qz;
+        const d = dx * dx + dy * dy + dz * dz;
+        if (d < best) best = d;
+      }
+      continue;
+    }
+    
+    const diff = query[axis] - nodeSplit[node];
+    const near = diff < 0 ? nodeLeft[node] : nodeRight[node];
+    const far = diff < 0 ? nodeRight[node] : nodeLeft[node];
+    
+    // Push far side first so the near side is searched first
+    stackNodes.push(far);
+    stackDist.push(diff * diff);
+    stackNodes.push(near);
+    stackDist.push(planeDist);
+  }
+  
+  return best;
+}
+
+module.exports = {
+  buildKdTree,
+  nearestNeighborSquaredDistance
+};
@@ -418,7 +418,54 @@ function poissonDiskSampling(points, targetCount, options = {}) {
   return sampledPoints;
 }
 
+/**
+ * Create a seeded pseudo-random number generator (mulberry32)
+ * Produces the same sequence for the same seed, so sampled results are reproducible.
+ * 
+ * @param {number} seed - 32-bit integer seed
+ * @returns {function(): number} - Function returning floats in [0, 1)
+ */
+function createSeededRandom(seed) {
+  let state = seed >>> 0;
+  return function random() {
+    state = (state + 0x6D2B79F5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+/**
+ * Random Index Sampling (Floyd's algorithm)
+ * Selects k distinct indices from [0, n) without replacement in O(k) time and
+ * memory, without materializing a permutation of all n indices.
+ * 
+ * @param {number} n - Number of items to sample from
+ * @param {number} k - Number of indices to select
+ * @param {function(): number} [random=Math.random] - Random number generator in [0, 1)
+ * @returns {Int32Array} - Selected indices in ascending order
+ */
+function randomSampleIndices(n, k, random = Math.random) {
+  if (k >= n) {
+    const all = new Int32Array(n);
+    for (let i = 0; i < n; i++) all[i] = i;
+    return all;
+  }
+  
+  const selected = new Set();
+  for (let j = n - k; j < n; j++) {
+    const t = Math.floor(random() * (j + 1));
+    selected.add(selected.has(t) ? j : t);
+  }
+  
+  // Sorted indices keep memory access sequential for the caller
+  return Int32Array.from(selected).sort();
+}
+
 module.exports = {
   importanceSampling,
-  poissonDiskSampling
+  poissonDiskSampling,
+  createSeededRandom,
+  randomSampleIndices
 };
@@ -0,0 +1,220 @@
+/**
+ * Uniform spatial grid for nearest neighbor queries on structure-of-arrays point clouds
+ * @module spatialGrid
+ */
+
+// Target average number of points per grid cell
+const TARGET_POINTS_PER_CELL = 2;
+// Upper bound on the number of cells relative to the number of points
+const MAX_CELLS_PER_POINT = 4;
+// Maximum number of attempts to fit the grid within the cell budget
+const MAX_SIZING_ATTEMPTS = 32;
+
+/**
+ * Build a uniform grid over a subset of points
+ * 
+ * The cell size is chosen from the bounding box volume so that cells hold
+ * about TARGET_POINTS_PER_CELL points on average. Flat axes (zero extent)
+ * get a single cell, so 2D and 1D clouds are handled as well. Points are
+ * stored cell by cell in one index array (counting sort), so the grid needs
+ * no per-cell allocations.
+ * 
+ * No grid is built when the cell size cannot be represented, e.g. when the
+ * extent of the points overflows to Infinity; callers then need another index.
+ * 
+ * @param {Float64Array} x - X coordinates
+ * @param {Float64Array} y - Y coordinates
+ * @param {Float64Array} z - Z coordinates
+ * @param {Array<number>|Int32Array} indices - Indices of the points to insert
+ * @returns {Object|null} Grid, including maxCellCount (points in the fullest cell),
+ *   or null if the extent of the points is not finite
+ */
+function buildUniformGrid(x, y, z, indices) {
+  const coords = [x, y, z];
+  const n = indices.length;
+  
+  // Bounding box of the inserted points
+  const min = [Infinity, Infinity, Infinity];
+  const max = [-Infinity, -Infinity, -Infinity];
+  for (let i = 0; i < n; i++) {
+    const idx = indices[i];
+    for (let axis = 0; axis < 3; axis++) {
+      const v = coords[axis][idx];
+      if (v < min[axis]) min[axis] = v;
+      if (v > max[axis]) max[axis] = v;
+    }
+  }
+  
+  // Cell size from the volume (area, length) spanned by the non-flat axes
+  let volume = 1;
+  let activeAxes = 0;
+  for (let axis = 0; axis < 3; axis++) {
+    const extent = max[axis] - min[axis];
+    if (!Number.isFinite(extent)) return null;
+    if (extent > 0) {
+      volume *= extent;
+      activeAxes++;
+    }
+  }
+  let cellSize = activeAxes > 0
+    ? Math.pow(volume * TARGET_POINTS_PER_CELL / Math.max(n, 1), 1 / activeAxes)
+    : 1;
+  
+  // Grow cells until the grid stays within the cell budget
+  const maxCells = Math.max(1, n * MAX_CELLS_PER_POINT);
+  let dims;
+  let totalCells;
+  for (let attempt = 0; ; attempt++) {
+    // Volume overflow or underflow leaves no usable cell size
+    if (!(cellSize > 0 && Number.isFinite(cellSize) && Number.isFinite(1 / cellSize))) return null;
+    if (attempt === MAX_SIZING_ATTEMPTS) return null;
+    
+    dims = [1, 1, 1];
+    for (let axis = 0; axis < 3; axis++) {
+      const extent = max[axis] - min[axis];
+      if (extent > 0) dims[axis] = Math.floor(extent / cellSize) + 1;
+    }
+    totalCells = dims[0] * dims[1] * dims[2];
+    if (totalCells <= maxCells) break;
+    cellSize *= Math.cbrt(totalCells / maxCells) * 1.01;
+  }
+  
+  const inverseCellSize = 1 / cellSize;
+  
+  // Counting sort of the points by cell
+  const pointCell = new Int32Array(n);
+  const cellStart = new Int32Array(totalCells + 1);
+  for (let i = 0; i < n; i++) {
+    const idx = indices[i];
+    const cx = Math.min(dims[0] - 1, Math.floor((x[idx] - min[0]) * inverseCellSize));
+    const cy = Math.min(dims[1] - 1, Math.floor((y[idx] - min[1]) * inverseCellSize));
+    const cz = Math.min(dims[2] - 1, Math.floor((z[idx] - min[2]) * inverseCellSize));
+    const cell = (cz * dims[1] + cy) * dims[0] + cx;
+    pointCell[i] = cell;
+    cellStart[cell + 1]++;
+  }
+  
+  let maxCellCount = 0;
+  for (let c = 0; c < totalCells; c++) {
+    if (cellStart[c + 1] > maxCellCount) maxCellCount = cellStart[c + 1];
+    cellStart[c + 1] += cellStart[c];
+  }
+  
+  const cellPoints = new Int32Array(n);
+  const fill = cellStart.slice(0, totalCells);
+  for (let i = 0; i < n; i++) {
+    cellPoints[fill[pointCell[i]]++] = indices[i];
+  }
+  
+  return {
+    x, y, z,
+    min,
+    dims,
+    cellSize,
+    inverseCellSize,
+    cellStart,
+    cellPoints,
+    maxCellCount
+  };
+}
+
+/**
+ * Distance from a coordinate to a cell's extent along one axis
+ * @param {number} q - Query coordinate
+ * @param {number} lo - Lower bound of the cell
+ * @param {number} size - Cell size
+ * @returns {number} Gap between the coordinate and the cell (0 if inside)
+ */
+function axisGap(q, lo, size) {
+  if (q < lo) return lo - q;
+  const hi = lo + size;
+  return q > hi ? q - hi : 0;
+}
+
+/**
+ * Find the squared distance from a point to its nearest neighbor in the grid
+ * 
+ * Cells are searched in shells of growing Chebyshev distance around the
+ * query's cell. Cells (and whole rows and slabs of cells) whose box is no
+ * closer than the best distance found so far are skipped without looking at
+ * their points. The search stops once the best distance found is no larger
+ * than the distance from the query to the faces of the block searched so far.
+ * 
+ * @param {Object} grid - Grid created by buildUniformGrid
+ * @param {number} qx - Query X coordinate
+ * @param {number} qy - Query Y coordinate
+ * @param {number} qz - Query Z coordinate
+ * @param {number} [excludeIndex=-1] - Point index to ignore (the query point itself)
+ * @returns {number} Squared nearest neighbor distance (Infinity if none found)
+ */
+function gridNearestNeighborSquaredDistance(grid, qx, qy, qz, excludeIndex = -1) {
+  const { x, y, z, min, dims, cellSize, inverseCellSize, cellStart, cellPoints } = grid;
+  const [nx, ny, nz] = dims;
+  
+  const cx = Math.max(0, Math.min(nx - 1, Math.floor((qx - min[0]) * inverseCellSize)));
+  const cy = Math.max(0, Math.min(ny - 1, Math.floor((qy - min[1]) * inverseCellSize)));
+  const cz = Math.max(0, Math.min(nz - 1, Math.floor((qz - min[2]) * inverseCellSize)));
+  const maxRing = Math.max(cx, nx - 1 - cx, cy, ny - 1 - cy, cz, nz - 1 - cz);
+  const query = [qx, qy, qz];
+  const center = [cx, cy, cz];
+  
+  let best = Infinity;
+  
+  for (let ring = 0; ring <= maxRing; ring++) {
+    if (ring > 0) {
+      // Every point outside the block searched so far is at least this far away
+      let reach = Infinity;
+      for (let axis = 0; axis < 3; axis++) {
+        const lo = center[axis] - (ring - 1);
+        const hi = center[axis] + (ring - 1);
+        if (lo > 0) reach = Math.min(reach, query[axis] - (min[axis] + lo * cellSize));
+        if (hi < dims[axis] - 1) reach = Math.min(reach, min[axis] + (hi + 1) * cellSize - query[axis]);
+      }
+      if (reach > 0 && best <= reach * reach) break;
+    }
+    
+    const x0 = Math.max(0, cx - ring);
+    const x1 = Math.min(nx - 1, cx + ring);
+    const y0 = Math.max(0, cy - ring);
+    const y1 = Math.min(ny - 1, cy + ring);
+    const z0 = Math.max(0, cz - ring);
+    const z1 = Math.min(nz - 1, cz + ring);
+    
+    for (let iz = z0; iz <= z1; iz++) {
+      const gz = axisGap(qz, min[2] + iz * cellSize, cellSize);
+      const gapZ = gz * gz;
+      if (gapZ >= best) continue;
+      const onZFace = iz === cz - ring || iz === cz + ring;
+      for (let iy = y0; iy <= y1; iy++) {
+        const gy = axisGap(qy, min[1] + iy * cellSize, cellSize);
+        const gapYZ = gapZ + gy * gy;
+        if (gapYZ >= best) continue;
+        const onYFace = onZFace || iy === cy - ring || iy === cy + ring;
+        // Inside the shell only the two X faces belong to this ring
+        const step = onYFace ? 1 : 2 * ring;
+        for (let ix = onYFace ? x0 : cx - ring; ix <= x1; ix += step) {
+          if (ix < 0) continue;
+          const gx = axisGap(qx, min[0] + ix * cellSize, cellSize);
+          if (gapYZ + gx * gx >= best) continue;
+          const cell = (iz * ny + iy) * nx + ix;
+          for (let k = cellStart[cell]; k < cellStart[cell + 1]; k++) {
+            const idx = cellPoints[k];
+            if (idx === excludeIndex) continue;
+            const dx = x[idx] - qx;
+            const dy = y[idx] - qy;
+            const dz = z[idx] - qz;
+            const d = dx * dx + dy * dy + dz * dz;
+            if (d < best) best = d;
+          }
+        }
+      }
+    }
+  }
+  
+  return best;
+}
+
+module.exports = {
+  buildUniformGrid,
+  gridNearestNeighborSquaredDistance
+};